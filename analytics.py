@@ -0,0 +1,145 @@
+import threading
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+
+from record_table import Status
+
+HIGH_RATING = 4.0   # '인생작' 기준 (top people 집계 대상)
+
+SORT_OPTIONS = {
+    "date": (["Date"], [False]),
+    "rating_desc": (["Rating", "Date"], [False, False]),
+    "rating_asc": (["Rating", "Date"], [True, False]),
+}
+
+
+class Aggregate:
+    """한 범위(전체 / 연도 / 플랫폼)의 누적 통계. 행 단위로 add 가능"""
+
+    def __init__(self):
+        self.count = 0
+        self.minutes = 0.0
+        self.rating_sum = 0.0
+        self.rating_n = 0
+        self.best = None          # (rating, date, title)
+        self.people = Counter()   # 4.0+ 작품의 CastCrew 이름
+
+    def add(self, row):
+        self.count += 1
+        self.minutes += row['RunningTime']
+        rating = row['Rating']
+        if rating is None:
+            return
+        self.rating_sum += rating
+        self.rating_n += 1
+        # 별점 -> 관람일 순 최고작 (동률이면 먼저 기록된 작품 유지)
+        key = (rating, row['Date'] or datetime.min)
+        if self.best is None or key > self.best[:2]:
+            self.best = (*key, row['Title'])
+        if rating >= HIGH_RATING:
+            self.people.update(n.strip() for n in str(row['CastCrew']).split(',') if n.strip())
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.rating_n if self.rating_n else float('nan')
+
+    @property
+    def best_title(self):
+        return self.best[2] if self.best else "-"
+
+    def top_people(self, n=7):
+        return self.people.most_common(n)
+
+
+class Analytics:
+    """
+    Dashboard 탭용 집계 모델 (데이터 버전당 한 번 계산, 입력은 record_table의 공유 테이블).
+    - 전체 / 연도별 / 플랫폼별 Aggregate
+    - 테이블 끝에 행이 추가된 경우면 새 행만 add (증분), 수정/삭제가 있으면 전체 재계산
+    - Review Log용 정렬 결과도 버전별로 메모이즈
+    찜/관심없음 행은 통계에서 제외 (찜 개수만 따로 셈).
+    """
+
+    def __init__(self):
+        self.version = None
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._table = None        # 마지막으로 반영한 테이블 (증분 판단용)
+        self.count = 0            # 통계 대상(watched) 행 수
+        self.wish_count = 0
+        self.total = Aggregate()
+        self.by_year = {}
+        self.by_platform = {}
+        self._views = {}
+
+    def sync(self, table, version=None):
+        with self._lock:
+            if version is not None and version == self.version:
+                return self
+            prev = self._table
+            n = len(prev) if prev is not None else 0
+            if not n or len(table) < n or not table.iloc[:n].equals(prev):
+                self._reset()
+                n = 0
+            for row in table.iloc[n:].to_dict('records'):
+                self._add(row)
+            self._table = table
+            self._views = {}
+            self.version = version
+            return self
+
+    def _add(self, row):
+        if row['Status'] == Status.WISH.value:
+            self.wish_count += 1
+            return
+        if row['Status'] != Status.WATCHED.value:
+            return
+
+        row = dict(row,
+                   Date=None if pd.isna(row['Date']) else row['Date'].to_pydatetime(),
+                   Rating=None if pd.isna(row['Rating']) else float(row['Rating']))
+        self.count += 1
+        self.total.add(row)
+        if row['Date']:
+            self.by_year.setdefault(row['Date'].year, Aggregate()).add(row)
+        for platform in str(row['Platform']).split(','):
+            platform = platform.strip()
+            if platform:
+                self.by_platform.setdefault(platform, Aggregate()).add(row)
+
+    def summary(self, year=None):
+        """전체(year=None) 또는 해당 연도 Aggregate"""
+        if year is None:
+            return self.total
+        return self.by_year.get(year) or Aggregate()
+
+    def view(self, sort="date", year=None):
+        """Review Log용 정렬/필터 결과 (sort: date | input | rating_desc | rating_asc)"""
+        with self._lock:
+            key = (sort, year)
+            if key not in self._views:
+                df = self._table
+                df = df[df['Status'] == Status.WATCHED.value]
+                if year is not None:
+                    df = df[df['Date'].dt.year == year]
+                if sort == "input":
+                    df = df.iloc[::-1]  # 최근에 추가된 행이 맨 뒤
+                else:
+                    by, ascending = SORT_OPTIONS[sort]
+                    df = df.sort_values(by=by, ascending=ascending)
+                self._views[key] = df
+            return self._views[key]
+
+    def year_starts(self, sort="date", year=None):
+        """view(sort, year)에서 연도별 첫 행 위치 {연도: 위치} (Review Log 연도 점프용)"""
+        with self._lock:
+            key = ("year_starts", sort, year)
+            if key not in self._views:
+                years = self.view(sort, year)['Date'].dt.year.reset_index(drop=True).dropna()
+                first = years.drop_duplicates()
+                self._views[key] = {int(y): int(pos) for pos, y in first.items()}
+            return self._views[key]
@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import toml
+from oauth2client.service_account import ServiceAccountCredentials
+import gspread
+
+from local_store import ID_COLUMNS, tmdb_key
+from tmdb_client import TMDBClient
+
+MAX_WORKERS = 4          # 동시 TMDB 요청 수
+MAX_REQ_PER_SEC = 20     # TMDB rate limit 여유있게 (공식 한도 ~40 req/s)
+WRITE_CHUNK = 200        # batch_update 1회당 행 수
+
+
+class RateLimiter:
+    """초당 요청 수 제한 (스레드 공유)"""
+    def __init__(self, per_sec):
+        self.interval = 1.0 / per_sec
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_for = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+def search_tmdb_id(client, title, release_date, limiter):
+    """제목(+개봉연도)으로 TMDB ID / 타입 찾기. 못 찾으면 None (429 재시도는 TMDBClient가 처리)"""
+    limiter.wait()
+    data = client.get("search/multi", query=title, language="ko-KR", page=1)
+    results = [r for r in data.get('results', []) if r.get('media_type') in ('movie', 'tv')]
+    if not results:
+        return None
+
+    # 개봉연도가 같은 결과 우선, 없으면 첫번째
+    year = str(release_date)[:4]
+    for r in results:
+        if year and (r.get('release_date') or r.get('first_air_date') or "").startswith(year):
+            return r['id'], r['media_type']
+    return results[0]['id'], results[0]['media_type']
+
+
+def backfill_tmdb_ids():
+    print("🔎 Backfilling TMDBId / MediaType...")
+
+    try:
+        secrets_data = toml.load(".streamlit/secrets.toml")
+        creds_dict = dict(secrets_data["gcp_service_account"])
+        api_key = secrets_data["tmdb_api_key"]
+    except Exception:
+        print("❌ Cannot load .streamlit/secrets.toml")
+        return
+
+    if "\\n" in creds_dict["private_key"]:
+        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
+
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+    sheet = gspread.authorize(creds).open("media_db").sheet1
+
+    values = sheet.get_all_values()
+    if not values:
+        print("Empty sheet, nothing to do.")
+        return
+
+    # 헤더 J:K 보장
+    if values[0][9:11] != ID_COLUMNS:
+        sheet.update("J1:K1", [ID_COLUMNS])
+        print("🧱 Added header columns: " + ", ".join(ID_COLUMNS))
+
+    # 아직 (TMDBId, MediaType) 쌍이 없는 행 (행 번호는 시트 기준, 헤더=1)
+    # movie / tv ID는 번호가 겹칠 수 있어 타입 없는 ID는 중복 체크에 쓰이지 않음 -> 다시 찾아서 둘 다 기록
+    todo = []
+    for row_idx, row in enumerate(values[1:], start=2):
+        row = row + [""] * (11 - len(row))
+        title, release_date = row[1], row[5]
+        if title and not tmdb_key(row[10], row[9]):
+            todo.append((row_idx, title, release_date))
+
+    print(f"📊 Rows without TMDBId/MediaType: {len(todo)}")
+    if not todo:
+        print("✅ Nothing to backfill.")
+        return
+
+    limiter = RateLimiter(MAX_REQ_PER_SEC)
+    client = TMDBClient(api_key, pool_size=MAX_WORKERS)
+
+    def work(item):
+        row_idx, title, release_date = item
+        try:
+            return row_idx, title, search_tmdb_id(client, title, release_date, limiter)
+        except Exception as e:
+            print(f"⚠️ {title}: {e}")
+            return row_idx, title, None
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        results = list(pool.map(work, todo))
+
+    updates = []
+    for row_idx, title, found in results:
+        if found:
+            updates.append({"range": f"J{row_idx}:K{row_idx}", "values": [[str(found[0]), found[1]]]})
+        else:
+            print(f"❓ Not found: {title}")
+
+    for i in range(0, len(updates), WRITE_CHUNK):
+        sheet.batch_update(updates[i:i + WRITE_CHUNK])
+
+    print(f"✅ Backfilled {len(updates)} / {len(todo)} rows.")
+
+
+if __name__ == "__main__":
+    backfill_tmdb_ids()
@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def make_key(*parts):
+    """key 구성요소(엔드포인트, 파라미터 등)를 순서 고정 JSON으로 직렬화해 해시"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheEntry:
+    def __init__(self, value, expires_at, meta):
+        self.value = value
+        self.expires_at = expires_at
+        self.meta = meta or {}
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+
+class DiskCache:
+    """
+    프로세스/재시작 간 공유되는 SQLite 기반 KV 캐시.
+    - 항목별 TTL (만료돼도 바로 지우지 않음 -> ETag 등으로 재검증 가능)
+    - max_entries / max_bytes 초과 시 가장 오래 안 쓴 항목부터 제거 (LRU)
+    - hit / miss 카운터
+    """
+
+    def __init__(self, path, max_entries=5000, max_bytes=64 * 1024 * 1024):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key         TEXT PRIMARY KEY,
+                value       TEXT,
+                meta        TEXT,
+                size        INTEGER,
+                expires_at  REAL,
+                accessed_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        """CacheEntry 반환 (만료된 항목도 반환 -> entry.fresh 로 판단). 없으면 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            entry = CacheEntry(json.loads(row[0]), row[2], json.loads(row[1]) if row[1] else {})
+            if entry.fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def set(self, key, value, ttl, meta=None):
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, meta, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, data, json.dumps(meta or {}), len(data), now + ttl, now),
+                )
+                self._evict()
+
+    def touch(self, key, ttl):
+        """재검증 성공(304 등) 시 만료시간만 연장"""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE cache SET expires_at = ?, accessed_at = ? WHERE key = ?", (now + ttl, now, key)
+                )
+
+    def _evict(self):
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # 여유분(10%)까지 LRU 순으로 정리
+        target_count = int(self.max_entries * 0.9)
+        target_bytes = int(self.max_bytes * 0.9)
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+            if count <= target_count and total <= target_bytes:
+                break
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {"entries": count, "bytes": total, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import groq
+import google.generativeai as genai
+
+from disk_cache import make_key
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GEMINI_MODEL = "gemini-1.5-flash"
+
+REQUEST_TIMEOUT = 20.0   # 제공자별 요청 타임아웃 (초)
+HEDGE_DELAY = 2.5        # 1순위(Groq)가 이 시간 안에 답하지 않으면 2순위(Gemini)도 동시에 호출
+RATE_WAIT = 1.0          # 토큰이 없을 때 기다리는 최대 시간 (넘으면 해당 제공자는 건너뜀)
+
+# 제공자별 (초당 토큰 보충량, 버킷 크기). 무료 티어 한도(Groq 30 RPM / Gemini 15 RPM)보다 약간 낮게
+RATE_LIMITS = {
+    "groq": (25 / 60, 5),
+    "gemini": (12 / 60, 3),
+}
+# 입력 중 미리 돌리는(speculative) 호출 전용 예산: 별도의 작은 버킷 + 제공자 버킷에 실제 호출용 토큰을 남겨 둠
+SPECULATIVE_LIMIT = (6 / 60, 2)
+SPECULATIVE_RESERVE = 2  # 제공자 버킷에 이 개수보다 많이 남아 있을 때만 speculative 호출
+
+
+class LLMUnavailable(Exception):
+    """모든 제공자가 실패/제한/타임아웃"""
+
+
+class TokenBucket:
+    """스레드 공유 토큰 버킷 (rate: 초당 보충 토큰, capacity: 최대 burst)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=0.0, reserve=0):
+        """토큰 1개 사용. reserve: 사용 후에도 이만큼은 남아 있어야 함 (우선순위 낮은 호출용)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1 + reserve:
+                    self.tokens -= 1
+                    return True
+                wait_for = (1 + reserve - self.tokens) / self.rate
+            if now + wait_for > deadline:
+                return False
+            time.sleep(wait_for)
+
+
+class LLMGateway:
+    """
+    LLM 호출 단일 창구 (JSON 응답 전용).
+    - Groq / Gemini 클라이언트를 프로세스 동안 재사용 (요청마다 새로 만들지 않음)
+    - 제공자별 토큰 버킷 rate limit + 요청 타임아웃
+    - Hedged request: Groq가 HEDGE_DELAY 안에 답하지 않거나 실패하면 Gemini를 띄우고, 먼저 온 유효한 JSON 사용
+    - 선택: DiskCache 응답 캐시 (key = 모델 + 프롬프트 + 생성 파라미터 해시, 재시작/다중 프로세스 간 공유)
+    """
+
+    def __init__(self, groq_api_key=None, gemini_api_key=None, cache=None,
+                 timeout=REQUEST_TIMEOUT, hedge_delay=HEDGE_DELAY):
+        self.cache = cache
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self._groq = groq.Groq(api_key=groq_api_key, timeout=timeout, max_retries=1) if groq_api_key else None
+        self._gemini = None
+        if gemini_api_key:
+            genai.configure(api_key=gemini_api_key)
+            self._gemini = genai.GenerativeModel(GEMINI_MODEL)
+        self._buckets = {name: TokenBucket(*limit) for name, limit in RATE_LIMITS.items()}
+        self._speculative_bucket = TokenBucket(*SPECULATIVE_LIMIT)
+        # 지고 있는 쪽 요청은 취소할 수 없으므로 끝날 때까지 돌도록 여유 있게
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+    def providers(self):
+        """사용 가능한 제공자 (우선순위 순)"""
+        return [name for name, client in (("groq", self._groq), ("gemini", self._gemini)) if client]
+
+    def _call_groq(self, prompt, temperature):
+        params = {"temperature": temperature} if temperature is not None else {}
+        chat_completion = self._groq.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=GROQ_MODEL,
+            response_format={"type": "json_object"},
+            **params,
+        )
+        return chat_completion.choices[0].message.content
+
+    def _call_gemini(self, prompt, temperature):
+        config = {"response_mime_type": "application/json"}
+        if temperature is not None:
+            config["temperature"] = temperature
+        response = self._gemini.generate_content(
+            prompt, generation_config=config, request_options={"timeout": self.timeout}
+        )
+        return response.text
+
+    def _attempt(self, provider, prompt, temperature, validate, speculative=False):
+        # speculative 호출은 기다리지 않고, 실제 호출용 토큰(SPECULATIVE_RESERVE)에는 손대지 않음
+        acquired = (self._buckets[provider].acquire(0.0, reserve=SPECULATIVE_RESERVE) if speculative
+                    else self._buckets[provider].acquire(RATE_WAIT))
+        if not acquired:
+            raise LLMUnavailable(f"{provider}: rate limited")
+        call = self._call_groq if provider == "groq" else self._call_gemini
+        data = json.loads(call(prompt, temperature))
+        return data, (validate(data) if validate else data)
+
+    def complete_json(self, prompt, temperature=None, validate=None, hedge=True, ttl=None, speculative=False):
+        """
+        프롬프트 -> JSON(dict). validate(data)가 있으면 그 반환값을 돌려주고, 예외를 던지면 유효하지 않은 응답으로 처리.
+        hedge=False 이면 1순위가 완전히 실패했을 때만 2순위 호출.
+        ttl(초)이 있으면 유효한 응답을 디스크 캐시에 저장/재사용 (실패는 저장하지 않음).
+        speculative=True: 결과가 안 쓰일 수도 있는 미리 호출. 전용 예산(SPECULATIVE_LIMIT) 안에서만, hedge 없이,
+        제공자 버킷이 여유 있을 때만 호출 -> 실제 호출의 rate limit을 잠식하지 않음.
+        모두 실패하면 LLMUnavailable.
+        """
+        waiting = list(self.providers())
+        if not waiting:
+            raise LLMUnavailable("no LLM provider configured")
+
+        key = None
+        if self.cache is not None and ttl:
+            # 어느 제공자가 답할지 모르므로 두 모델 이름 모두 key에 포함
+            key = make_key("llm", GROQ_MODEL, GEMINI_MODEL, prompt, {"temperature": temperature})
+            entry = self.cache.get(key)
+            if entry and entry.fresh:
+                try:
+                    return validate(entry.value) if validate else entry.value
+                except Exception:
+                    pass  # 검증 규칙이 바뀐 옛 응답 -> 다시 호출
+
+        if speculative:
+            if not self._speculative_bucket.acquire():
+                raise LLMUnavailable("speculative budget exhausted")
+            hedge = False
+
+        errors = []
+        pending = set()
+        deadline = time.monotonic() + self.timeout + self.hedge_delay
+        while True:
+            # 다음 제공자 호출: 진행 중인 요청이 없거나(앞 요청 실패), hedge 모드에서 hedge_delay가 지났을 때
+            if waiting and (not pending or hedge):
+                pending.add(self._pool.submit(self._attempt, waiting.pop(0), prompt, temperature, validate, speculative))
+
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                break
+            timeout = min(self.hedge_delay, remaining) if hedge and waiting else remaining
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    data, result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if key:
+                    self.cache.set(key, data, ttl)
+                return result
+
+        raise LLMUnavailable("; ".join(str(e) for e in errors) or "timed out")
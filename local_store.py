@@ -0,0 +1,307 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from gspread.utils import numericise_all, rowcol_to_a1
+
+# --- 로컬 캐시 위치 ---
+# 컨테이너/배포 환경에서는 MEDIA_ARCHIVE_CACHE_DIR 로 영구 볼륨을 지정
+CACHE_DIR = os.environ.get(
+    "MEDIA_ARCHIVE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+
+SYNC_INTERVAL = 60            # delta sync 최소 간격 (초)
+FULL_RESYNC_INTERVAL = 1800   # 시트에서 직접 셀을 고친 경우를 잡기 위한 전체 재동기화 주기 (초)
+
+
+TMDB_ID_COLUMN = "TMDBId"     # 중복 인덱스에 TMDB ID 키도 추가
+MEDIA_TYPE_COLUMN = "MediaType"
+ID_COLUMNS = [TMDB_ID_COLUMN, MEDIA_TYPE_COLUMN]  # 시트 J:K
+
+
+def normalize_title(title):
+    """중복 체크용 제목 정규화: 'Squid Game: 시즌 1 ' == 'squid game 시즌1'"""
+    t = unicodedata.normalize("NFKC", str(title)).casefold().strip()
+    key = "".join(ch for ch in t if ch.isalnum())
+    return key or t
+
+
+def tmdb_key(media_type, tmdb_id):
+    """중복 인덱스 key: ('movie', '603'). movie와 tv ID는 같은 숫자라도 다른 작품이라 타입과 함께 사용. 둘 중 하나라도 없으면 None"""
+    media_type = str(media_type or "").strip()
+    tmdb_id = str(tmdb_id if tmdb_id is not None else "").strip()
+    if media_type not in ("movie", "tv") or not tmdb_id:
+        return None
+    return media_type, tmdb_id
+
+
+def strip_trailing(values):
+    """끝쪽 빈 셀 제거 (get_all_values는 가장 긴 행에 맞춰 채우고 batch_get은 잘라서 줌)"""
+    values = [str(v) for v in values]
+    while values and not values[-1].strip():
+        values.pop()
+    return values
+
+
+def col_letter(col):
+    """1 -> 'A', 27 -> 'AA'"""
+    return rowcol_to_a1(1, col)[:-1]
+
+
+class SheetMirror:
+    """
+    media_db 시트의 로컬 SQLite 미러.
+    - 모든 읽기는 로컬 DB(+ 버전별 메모리 캐시)에서 처리
+    - 시트는 delta sync(새로 추가된 행 + Title 컬럼 drift 체크)로만 조회
+    - drift(삭제/재정렬/제목 수정)가 감지되거나 강제 새로고침 시에만 전체 재동기화
+    """
+
+    def __init__(self, path=None):
+        path = path or os.path.join(CACHE_DIR, "media_db.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS rows (
+                row_idx INTEGER PRIMARY KEY,  -- 시트 상의 실제 행 번호 (헤더=1)
+                title   TEXT,
+                data    TEXT                  -- 원본 셀 값 (JSON list)
+            );
+            CREATE INDEX IF NOT EXISTS idx_rows_title ON rows(title);
+        """)
+        self._conn.commit()
+        self._last_check = 0.0
+        self._records = None
+        self._row_ids = None
+        self._index = None
+        self._records_version = None
+
+    # --- meta helpers ---
+    def _get_meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _bump_version(self):
+        self._set_meta("version", self.version + 1)
+
+    @property
+    def version(self):
+        """데이터가 바뀔 때마다 증가하는 번호 (파생 캐시의 키로 사용)"""
+        # 같은 커넥션을 쓰는 다른 스레드의 커밋 전 트랜잭션을 보지 않도록 lock 안에서 읽음
+        with self._lock:
+            return self._get_meta("version", 0)
+
+    @property
+    def header(self):
+        return self._get_meta("header", [])
+
+    def row_count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def _title_col(self, header):
+        return header.index("Title") if "Title" in header else 1
+
+    # --- Sync ---
+    def sync_due(self):
+        return time.time() - self._last_check >= SYNC_INTERVAL
+
+    def sync(self, sheet, force=False):
+        """
+        시트와 동기화. 변경이 있었으면 True.
+        force=True 이면 전체 재동기화 (새로고침 버튼 등).
+        """
+        with self._lock:
+            now = time.time()
+            if not force and now - self._last_check < SYNC_INTERVAL:
+                return False
+            self._last_check = now
+
+            header = self.header
+            if force or not header or now - self._get_meta("last_full_sync", 0) > FULL_RESYNC_INTERVAL:
+                self._full_resync(sheet)
+                return True
+            return self._delta_sync(sheet, header)
+
+    def _full_resync(self, sheet):
+        values = sheet.get_all_values()
+        header = strip_trailing(values[0]) if values else []
+        rows = values[1:]
+        # 시트 끝의 빈 행 제거
+        while rows and not any(str(v).strip() for v in rows[-1]):
+            rows.pop()
+
+        with self._conn:
+            self._conn.execute("DELETE FROM rows")
+            self._insert_rows(2, rows, header)
+            self._set_meta("header", header)
+            self._set_meta("last_full_sync", time.time())
+            self._bump_version()
+
+    def _delta_sync(self, sheet, header):
+        """
+        API 1회(batch_get): 헤더 + Title 컬럼 전체 + 마지막 동기화 이후 추가된 행.
+        헤더나 Title 컬럼이 로컬과 어긋나면(컬럼 추가/삭제/정렬/수정) 전체 재동기화로 전환.
+        """
+        n = self.row_count()
+        t_col = col_letter(self._title_col(header) + 1)
+        title_range = f"{t_col}2:{t_col}"
+        tail_range = f"A{n + 2}:{col_letter(len(header))}"
+
+        remote_header, remote_titles, tail = sheet.batch_get(["1:1", title_range, tail_range])
+        if strip_trailing(remote_header[0] if remote_header else []) != header:
+            # 컬럼 추가 등 헤더 변경 -> 전체 재동기화
+            self._full_resync(sheet)
+            return True
+        remote_titles = [str(r[0]) if r else "" for r in remote_titles]
+        remote_titles += [""] * (n - len(remote_titles))  # 끝쪽 빈 제목 셀은 API가 잘라서 줌
+        local_titles = [r[0] for r in self._conn.execute("SELECT title FROM rows ORDER BY row_idx")]
+
+        if remote_titles[:n] != local_titles:
+            self._full_resync(sheet)
+            return True
+
+        tail = [list(r) for r in tail]
+        while tail and not any(str(v).strip() for v in tail[-1]):
+            tail.pop()
+        if not tail:
+            return False
+
+        with self._conn:
+            self._insert_rows(n + 2, tail, header)
+            self._bump_version()
+        return True
+
+    def _insert_rows(self, start_row_idx, rows, header):
+        t = self._title_col(header)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO rows (row_idx, title, data) VALUES (?, ?, ?)",
+            [
+                (start_row_idx + i, str(r[t]) if len(r) > t else "", json.dumps([str(v) for v in r], ensure_ascii=False))
+                for i, r in enumerate(rows)
+            ],
+        )
+
+    # --- Write-through ---
+    # 앱에서 시트에 쓴 내용을 미러에 바로 반영 (쓰기 직후 시트 전체를 다시 읽지 않도록)
+    def apply_append(self, values, row_idx=None):
+        """
+        append_row 결과를 미러에 추가.
+        row_idx: 시트가 실제로 기록한 행 번호 (응답의 updatedRange). 예상과 다르면 drift로 보고 재동기화 예약.
+        반환값: 미러에 기록된 행 번호 (drift면 None)
+        """
+        with self._lock:
+            expected = self.row_count() + 2
+            if row_idx is not None and row_idx != expected:
+                self.invalidate()
+                return None
+            with self._conn:
+                self._insert_rows(expected, [values], self.header)
+                self._bump_version()
+            return expected
+
+    def apply_update(self, row_idx, values):
+        """sheet.update(A{row}:..) 결과를 미러의 해당 행에 반영"""
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM rows WHERE row_idx = ?", (row_idx,)).fetchone()
+            if not exists:
+                self.invalidate()
+                return
+            with self._conn:
+                self._insert_rows(row_idx, [values], self.header)
+                self._bump_version()
+
+    def invalidate(self):
+        """다음 sync 때 전체 재동기화하도록 표시 (drift 감지 시)"""
+        with self._lock:
+            with self._conn:
+                self._set_meta("last_full_sync", 0)
+            self._last_check = 0.0
+
+    # --- Read ---
+    def _load(self):
+        """버전이 바뀌었을 때만 records / 행 번호 / 중복 인덱스를 다시 만듦"""
+        version = self.version
+        if self._records is not None and self._records_version == version:
+            return
+
+        header = self.header
+        id_col = header.index(TMDB_ID_COLUMN) if TMDB_ID_COLUMN in header else None
+        type_col = header.index(MEDIA_TYPE_COLUMN) if MEDIA_TYPE_COLUMN in header else None
+        t_col = self._title_col(header)
+        records, row_ids = [], []
+        by_title, by_tmdb, untyped_titles = {}, {}, {}
+        for row_idx, data in self._conn.execute("SELECT row_idx, data FROM rows ORDER BY row_idx"):
+            values = json.loads(data)
+            values = (values + [""] * len(header))[:len(header)]
+            pos = len(records)
+            records.append(dict(zip(header, numericise_all(values, default_blank=""))))
+            row_ids.append(row_idx)
+
+            # 같은 작품이 여러 번 있으면 가장 위의 행 우선 (기존 .index[0] 동작과 동일)
+            title_key = normalize_title(values[t_col])
+            by_title.setdefault(title_key, pos)
+            # movie / tv ID는 별개 번호 체계 -> (MediaType, TMDBId) 쌍으로만 식별
+            key = tmdb_key(values[type_col] if type_col is not None else "",
+                           values[id_col] if id_col is not None else "")
+            if key:
+                by_tmdb.setdefault(key, pos)
+            else:
+                untyped_titles.setdefault(title_key, pos)
+
+        self._records = records
+        self._row_ids = row_ids
+        self._index = {"title": by_title, "tmdb": by_tmdb, "untyped_title": untyped_titles}
+        self._records_version = version
+
+    def records(self):
+        """
+        sheet.get_all_records()와 같은 모양의 list[dict] 반환.
+        버전이 바뀌지 않았으면 메모리에 들고 있는 리스트를 그대로 돌려줌 (읽기 전용으로 사용할 것).
+        """
+        with self._lock:
+            self._load()
+            return self._records
+
+    def snapshot(self):
+        """
+        (version, records)를 lock 안에서 한 번에 반환.
+        파생 캐시(테이블/모델/인덱스)는 이 쌍으로 키를 잡아야 옛 records가 새 version으로 저장되지 않음
+        """
+        with self._lock:
+            self._load()
+            return self._records_version, self._records
+
+    def lookup(self, title=None, tmdb_id=None, media_type=None):
+        """
+        중복 체크용 O(1) 조회: (media_type, TMDB ID) 우선.
+        ID로 찾지 못하면 ID가 없는 행만 정규화된 제목으로 비교 (ID가 다른 행 = 다른 작품).
+        조회 쪽에 ID가 없으면(직접 입력) 모든 행을 제목으로 비교.
+        반환값: (시트 행 번호, record) 또는 None
+        """
+        with self._lock:
+            self._load()
+            pos = None
+            key = tmdb_key(media_type, tmdb_id)
+            if key:
+                pos = self._index["tmdb"].get(key)
+            if pos is None and title:
+                titles = self._index["untyped_title"] if key else self._index["title"]
+                pos = titles.get(normalize_title(title))
+            if pos is None:
+                return None
+            return self._row_ids[pos], self._records[pos]
+
+    def title_keys(self):
+        """정규화 제목 집합 (set 연산 가능한 keys view)"""
+        with self._lock:
+            self._load()
+            return self._index["title"].keys()
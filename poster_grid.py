@@ -0,0 +1,39 @@
+from html import escape
+from urllib.parse import urlencode
+
+# 카드 스타일(.movie-card)은 app.py의 전역 CSS에 있음. 여기서는 그리드 배치만 담당
+GRID_GAP = "12px"
+# <img>로 그릴 이미지 주소: 원격 URL + 로컬 썸네일 캐시의 static URL (상대 경로 app/static/...)
+IMAGE_PREFIXES = ("http", "app/static/")
+
+
+def card_link(media_id, media_type):
+    """카드 클릭 -> 작품 선택 (app.py 상단의 sel_id 쿼리 파라미터 핸들러)"""
+    return "/?" + urlencode({"sel_id": media_id, "sel_type": media_type or "movie"})
+
+
+def card_html(title, image=None, subtitle="", stars="", href=None):
+    """포스터 카드 하나 (이미지는 화면에 들어올 때 로드)"""
+    if image and str(image).startswith(IMAGE_PREFIXES):
+        poster = f'<img src="{escape(str(image))}" loading="lazy" decoding="async" alt="" />'
+    else:
+        poster = '<div class="card-placeholder">🎬</div>'
+    info = f'<div class="card-title">{escape(str(title))}</div>'
+    if stars:
+        info += f'<div class="card-stars">{escape(stars)}</div>'
+    if subtitle:
+        info += f'<div class="card-year">{escape(str(subtitle))}</div>'
+    card = f'<div class="movie-card">{poster}<div class="card-info">{info}</div></div>'
+    if href:
+        return f'<a href="{escape(href)}" target="_self" class="movie-card-link">{card}</a>'
+    return f'<div class="movie-card-link">{card}</div>'
+
+
+def grid_html(cards, columns=6):
+    """
+    카드 목록 -> CSS grid 한 덩어리 HTML (st.markdown 한 번으로 전체 그리드 전송).
+    cards: card_html()의 인자 dict 목록. 줄바꿈/들여쓰기 없이 만들어 markdown 코드 블록으로 해석되지 않게 함.
+    """
+    items = "".join(card_html(**card) for card in cards)
+    style = f"grid-template-columns: repeat({int(columns)}, minmax(0, 1fr)); gap: {GRID_GAP};"
+    return f'<div class="poster-grid" style="{style}">{items}</div>'
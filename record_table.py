@@ -0,0 +1,140 @@
+import threading
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+
+class Status(str, Enum):
+    """기록 상태 (Comment 마커로 구분)"""
+    WATCHED = "watched"
+    WISH = "찜"          # Comment == "[찜]"
+    IGNORED = "관심없음"  # Comment == "[관심없음]"
+
+
+STATUS_DTYPE = pd.CategoricalDtype([s.value for s in Status])
+MEDIA_DTYPE = pd.CategoricalDtype(["movie", "tv"])
+
+TEXT_COLUMNS = ["Title", "Comment", "Image", "CastCrew", "TMDBId"]
+
+
+def build_table(records):
+    """
+    get_cached_records() (list[dict]) -> 타입이 정해진 DataFrame.
+    Date: datetime64 (NaT) / Rating: float (NaN) / RunningTime: int (없으면 0) / Platform: category
+    MediaType: 시트 값 (backfill 전이면 빈 값), InferredType: MediaType 또는 플랫폼/러닝타임으로 추론한 movie|tv
+    Status: watched | 찜 | 관심없음
+    원본 행 순서(= 기록 순서)와 RangeIndex 유지.
+    """
+    df = pd.DataFrame.from_records(records) if records else pd.DataFrame()
+    n = len(df)
+
+    def col(name, default=""):
+        return df[name] if name in df.columns else pd.Series([default] * n, dtype=object)
+
+    table = pd.DataFrame(index=pd.RangeIndex(n))
+    table["Date"] = pd.to_datetime(col("Date").astype(str), errors="coerce", format="mixed")
+    for name in TEXT_COLUMNS:
+        table[name] = col(name).fillna("").astype(str)
+    table["Platform"] = col("Platform").fillna("").astype(str).astype("category")
+    table["Rating"] = pd.to_numeric(col("Rating").replace("", np.nan), errors="coerce").astype(float)
+    table["RunningTime"] = pd.to_numeric(col("RunningTime").replace("", np.nan), errors="coerce").fillna(0).astype(int)
+    table["ReleaseDate"] = col("ReleaseDate").fillna("").astype(str)
+    # "Netflix | 8부작" -> "netflix" (회차 정보 제거, 소문자; 추천 seed 플랫폼 매칭용)
+    table["BasePlatform"] = table["Platform"].astype(str).str.split("|").str[0].str.strip().str.casefold().astype("category")
+
+    media = col("MediaType").fillna("").astype(str)
+    table["MediaType"] = media.astype(MEDIA_DTYPE)
+    # '부작' 텍스트가 있거나 러닝타임이 200분 넘으면 TV로 간주 (MediaType backfill 전 행용)
+    guessed_tv = table["Platform"].astype(str).str.contains("부작", regex=False) | (table["RunningTime"] > 200)
+    inferred = np.where(media.isin(["movie", "tv"]), media, np.where(guessed_tv, "tv", "movie"))
+    table["InferredType"] = pd.Categorical(inferred, dtype=MEDIA_DTYPE)
+
+    comment = table["Comment"]
+    status = np.where(comment.str.contains("[찜]", regex=False), Status.WISH.value,
+             np.where(comment.str.contains("[관심없음]", regex=False), Status.IGNORED.value, Status.WATCHED.value))
+    table["Status"] = pd.Categorical(status, dtype=STATUS_DTYPE)
+    return table
+
+
+class RecordTable:
+    """
+    데이터 버전별 공유 테이블 (모든 탭/기능이 같은 DataFrame을 읽음).
+    반환된 DataFrame은 읽기 전용으로 사용할 것 (필요하면 .copy()).
+    """
+
+    def __init__(self):
+        self.version = None
+        self._table = build_table([])
+        self._seed_index = None
+        self._lock = threading.Lock()
+
+    def get(self, records, version):
+        with self._lock:
+            if version is None or version != self.version:
+                self._table = build_table(records)
+                self._seed_index = None
+                self.version = version
+            return self._table
+
+    def seed_index(self):
+        """현재 테이블의 SeedIndex (처음 요청될 때 한 번 생성)"""
+        with self._lock:
+            if self._seed_index is None:
+                self._seed_index = SeedIndex(self._table)
+            return self._seed_index
+
+
+ANY = "*"  # SeedIndex에서 '타입/플랫폼 무관' 키
+
+
+def platform_tokens(platform):
+    """'Netflix, Watcha | 8부작' -> ['netflix', 'watcha'] (BasePlatform과 같은 규칙)"""
+    base = str(platform).split("|")[0]
+    return [t.strip().casefold() for t in base.split(",") if t.strip()]
+
+
+class SeedIndex:
+    """
+    find_proxy_seed용 (InferredType, 플랫폼) -> 후보 인덱스.
+    키마다 행 위치를 최신 기록순으로 정렬해 두고, 평점 조건을 만족하는 첫 행을 벡터 연산으로 찾음.
+    타입/플랫폼 무관(ANY) 키도 함께 만들어 fallback도 같은 방식으로 조회.
+    """
+
+    def __init__(self, table):
+        self._groups = {}
+        if table.empty:
+            return
+        rows = pd.DataFrame({
+            "pos": np.arange(len(table)),
+            "type": table["InferredType"].astype(str).to_numpy(),
+            "token": table["BasePlatform"].astype(str).str.split(",").to_numpy(),
+            "rating": table["Rating"].to_numpy(dtype=float),
+        })
+        # 멀티 플랫폼("netflix, watcha")은 플랫폼마다 한 번씩
+        by_token = rows.explode("token")
+        by_token["token"] = by_token["token"].str.strip()
+        by_token = by_token[by_token["token"] != ""].drop_duplicates(["token", "pos"])
+        combos = pd.concat([
+            by_token,
+            by_token.assign(type=ANY),
+            rows.assign(token=ANY),
+            rows.assign(type=ANY, token=ANY),
+        ])
+        combos = combos.sort_values("pos", ascending=False, kind="stable")
+        for key, group in combos.groupby(["type", "token"], sort=False):
+            self._groups[key] = (group["pos"].to_numpy(dtype=int), group["rating"].to_numpy(dtype=float))
+
+    def has(self, media_type=ANY, token=ANY):
+        return (media_type, token) in self._groups
+
+    def latest(self, media_type=ANY, token=ANY, min_rating=0.0):
+        """해당 그룹에서 평점 >= min_rating 인 가장 최근 행 위치 (없으면 None)"""
+        group = self._groups.get((media_type, token))
+        if group is None:
+            return None
+        positions, ratings = group
+        ok = ratings >= min_rating
+        if not ok.any():
+            return None
+        return int(positions[ok.argmax()])
@@ -0,0 +1,104 @@
+import functools
+import threading
+import time
+
+from disk_cache import make_key
+
+SUCCESS = "success"
+EMPTY = "empty"
+ERROR = "error"
+
+ERROR_TTL = 5.0        # 첫 실패 후 재시도까지 대기 (초)
+MAX_ERROR_TTL = 120.0  # 연속 실패 시 backoff 상한 (초)
+MAX_ENTRIES = 2048
+
+# 함수별 저장소. app.py는 rerun마다 다시 실행되므로 데코레이터가 새로 만들어져도 같은 저장소를 쓰도록 모듈에 보관
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class ResultUnavailable(Exception):
+    """최근 실패로 backoff 중이라 호출하지 않음 (fallback이 없을 때만 발생)"""
+
+
+class _Entry:
+    __slots__ = ("outcome", "value", "expires_at", "failures")
+
+    def __init__(self, outcome, value, expires_at, failures=0):
+        self.outcome = outcome
+        self.value = value
+        self.expires_at = expires_at
+        self.failures = failures
+
+
+def _is_empty(value):
+    return value is None or (hasattr(value, "__len__") and len(value) == 0)
+
+
+def cached_result(ttl=3600, empty_ttl=600, error_ttl=ERROR_TTL, max_error_ttl=MAX_ERROR_TTL,
+                  fallback=ResultUnavailable, is_empty=_is_empty, max_entries=MAX_ENTRIES):
+    """
+    성공 / 빈 결과 / 에러를 구분하는 메모리 캐시 데코레이터 (st.cache_data 대체).
+    - 성공: ttl 동안 캐시
+    - 빈 결과(검색 결과 없음 등): 더 짧은 empty_ttl 동안 캐시
+    - 에러(함수가 예외를 던짐): 값을 저장하지 않음. 같은 key는 error_ttl * 2^(연속 실패-1) 동안만
+      호출을 건너뛰고(backoff, 상한 max_error_ttl) 이후 다시 시도 -> 일시 장애가 결과를 오래 오염시키지 않음
+    - 에러/backoff 중에는 fallback을 반환 (fallback 미지정 시 예외를 그대로 올림)
+    감싼 함수는 실패를 반환값(0.0, [] 등)으로 숨기지 말고 예외로 알려야 함.
+    """
+
+    def decorator(fn):
+        with _stores_lock:
+            entries, lock = _stores.setdefault(f"{fn.__module__}.{fn.__qualname__}", ({}, threading.Lock()))
+
+        def fail(exc):
+            if fallback is ResultUnavailable:
+                raise exc
+            return fallback
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = make_key(fn.__qualname__, args, kwargs)
+            now = time.time()
+            with lock:
+                entry = entries.get(key)
+            if entry and now < entry.expires_at:
+                if entry.outcome == ERROR:
+                    return fail(ResultUnavailable(f"{fn.__name__}: retry in {entry.expires_at - now:.0f}s"))
+                return entry.value
+
+            try:
+                value = fn(*args, **kwargs)
+            except Exception as e:
+                failures = entry.failures + 1 if entry and entry.outcome == ERROR else 1
+                backoff = min(error_ttl * 2 ** (failures - 1), max_error_ttl)
+                with lock:
+                    entries[key] = _Entry(ERROR, None, time.time() + backoff, failures)
+                print(f"{fn.__name__} failed ({failures}x, retry in {backoff:.1f}s): {e}")
+                return fail(e)
+
+            outcome = EMPTY if is_empty(value) else SUCCESS
+            with lock:
+                entries[key] = _Entry(outcome, value, time.time() + (empty_ttl if outcome == EMPTY else ttl))
+                if len(entries) > max_entries:
+                    # 만료된 것 먼저, 그래도 많으면 오래된 순 (dict 삽입 순서)
+                    for k in [k for k, v in entries.items() if v.expires_at <= now] or list(entries)[:len(entries) // 10]:
+                        entries.pop(k, None)
+            return value
+
+        def clear():
+            with lock:
+                entries.clear()
+
+        def stats():
+            with lock:
+                counts = {SUCCESS: 0, EMPTY: 0, ERROR: 0}
+                for entry in entries.values():
+                    counts[entry.outcome] += 1
+            return counts
+
+        wrapper.clear = clear
+        wrapper.stats = stats
+        return wrapper
+
+    return decorator
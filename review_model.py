@@ -0,0 +1,272 @@
+import math
+import re
+import threading
+import unicodedata
+import zlib
+
+import numpy as np
+
+N_FEATURES = 2 ** 12      # 해시 버킷 수 (행렬 크기: 리뷰 수 x N_FEATURES float32)
+NGRAM_RANGE = (1, 3)      # 문자 n-gram (한국어 짧은 코멘트는 단어보다 음절 조각이 잘 맞음)
+RIDGE_LAMBDA = 0.5        # 규제 강도 (= GP 관점의 노이즈 분산)
+MIN_SAMPLES = 30          # 이보다 적으면 예측하지 않음 (confidence 0)
+MAX_SAMPLES = 2000        # 학습에 쓰는 최근 리뷰 수 상한 ((K + λI)^-1 이 n x n float64 -> 2000개면 32MB, fit 약 1초)
+REFIT_GROWTH = 0.2        # IDF를 다시 계산하는 기준 (마지막 fit 이후 20% 이상 추가됐을 때)
+RATING_MIN, RATING_MAX = 0.5, 5.0
+
+
+def normalize_text(text):
+    t = unicodedata.normalize("NFKC", str(text)).casefold()
+    return re.sub(r"\s+", " ", t).strip()
+
+
+def char_ngrams(text, ngram_range=NGRAM_RANGE):
+    t = f" {normalize_text(text)} "
+    lo, hi = ngram_range
+    grams = (t[i:i + n] for n in range(lo, hi + 1) for i in range(len(t) - n + 1))
+    return [g for g in grams if g.strip()]  # 공백만 있는 조각은 모든 문서에 공통이라 제외
+
+
+def hash_counts(text, n_features=N_FEATURES):
+    """문자 n-gram -> 해시 버킷별 개수 (crc32: 프로세스가 달라도 같은 버킷)"""
+    v = np.zeros(n_features, dtype=np.float32)
+    for g in char_ngrams(text):
+        v[zlib.crc32(g.encode("utf-8")) % n_features] += 1
+    return v
+
+
+class RatingModel:
+    """
+    아카이브 리뷰(Comment -> Rating)로 학습하는 로컬 평점 예측기 (CPU, NumPy만 사용).
+    - 특징: 해시 문자 n-gram TF-IDF (sublinear tf, L2 정규화)
+    - 모델: 커널(선형) ridge 회귀를 dual form으로 풂 -> 리뷰 수백~수천 개면 ms 단위
+    - 학습 데이터: 최근 MAX_SAMPLES개 리뷰 (넘으면 가장 오래된 리뷰부터 제외)
+    - 증분 학습: 새 리뷰는 (K + λI)^-1 블록 역행렬 갱신(O(n²))으로 추가, IDF는 데이터가 충분히 늘면 재계산
+    - 전체 재학습은 lock 밖에서 계산 후 교체 -> 학습 중에도 predict는 이전 모델로 바로 응답
+    - 신뢰도: GP 관점 예측 분산을 leave-one-out 잔차로 보정 -> '반 별(±0.5) 안에 맞을 확률'
+    """
+
+    def __init__(self, lam=RIDGE_LAMBDA, min_samples=MIN_SAMPLES, max_samples=MAX_SAMPLES):
+        self.lam = lam
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.version = None       # 학습에 쓴 데이터 버전 (SheetMirror.version)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.pairs = []           # 학습한 (comment, rating) 순서대로 (최근 max_samples개)
+        self._offset = 0          # sync에 들어온 전체 목록에서 self.pairs가 시작하는 위치
+        self._idf = None
+        self._X = None            # TF-IDF 행렬 (n x N_FEATURES)
+        self._G = None            # (K + λI)^-1
+        self._y_mean = 0.0
+        self._alpha = None
+        self._scale = 1.0         # LOO로 보정한 오차 스케일
+        self._fit_size = 0
+        self._added = 0           # 마지막 fit 이후 증분 추가한 리뷰 수
+
+    def __len__(self):
+        return len(self.pairs)
+
+    # --- 특징 ---
+    def _tfidf(self, counts, idf=None):
+        x = np.log1p(counts) * (self._idf if idf is None else idf)
+        norm = np.linalg.norm(x, axis=-1, keepdims=True)
+        return x / np.maximum(norm, 1e-9)
+
+    # --- 학습 ---
+    def _build(self, pairs):
+        """pairs -> (idf, X, G). 모델 상태를 건드리지 않으므로 lock 없이 계산"""
+        counts = np.stack([hash_counts(c) for c, _ in pairs])
+        df = (counts > 0).sum(axis=0)
+        n = len(pairs)
+        idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        X = self._tfidf(counts, idf)
+        K = X @ X.T
+        G = np.linalg.inv(K.astype(np.float64) + self.lam * np.eye(n))
+        return idf, X, G
+
+    def _refit(self, pairs, offset=0, version=None):
+        """전체 재학습: 최근 max_samples개로 lock 밖에서 계산한 뒤 한 번에 교체"""
+        window = pairs[-self.max_samples:] if self.max_samples else pairs
+        built = self._build(window) if window else None
+        with self._lock:
+            self._reset()
+            self.pairs = list(window)
+            self._offset = offset + len(pairs) - len(window)
+            if built:
+                self._idf, self._X, self._G = built
+                self._fit_size = len(window)
+                self._solve()
+            self.version = version
+        return self
+
+    def fit(self, comments, ratings):
+        """전체 재학습 (최근 max_samples개)"""
+        return self._refit(list(zip(comments, [float(r) for r in ratings])))
+
+    def _needs_refit(self, count=1):
+        return self._G is None or self._added + count > self._fit_size * REFIT_GROWTH
+
+    def add(self, comment, rating):
+        """리뷰 하나 증분 추가 (블록 역행렬 갱신, IDF 고정). max_samples를 넘으면 가장 오래된 리뷰 제외"""
+        with self._lock:
+            if self._needs_refit():
+                return self._refit(self.pairs + [(comment, float(rating))], self._offset, self.version)
+
+            x = self._tfidf(hash_counts(comment))
+            b = (self._X @ x).astype(np.float64)
+            c = float(x @ x) + self.lam
+            Gb = self._G @ b
+            s = c - b @ Gb
+            n = len(self.pairs)
+            G = np.empty((n + 1, n + 1))
+            G[:n, :n] = self._G + np.outer(Gb, Gb) / s
+            G[:n, n] = G[n, :n] = -Gb / s
+            G[n, n] = 1 / s
+
+            self._G = G
+            self._X = np.vstack([self._X, x])
+            self.pairs.append((comment, float(rating)))
+            self._added += 1
+            if self.max_samples and len(self.pairs) > self.max_samples:
+                self._drop_oldest()
+            self._solve()
+            return self
+
+    def _drop_oldest(self):
+        """첫 행 제외: (K + λI)^-1 에서 한 행/열을 뺀 역행렬 (Schur complement, O(n²))"""
+        G = self._G
+        self._G = G[1:, 1:] - np.outer(G[1:, 0], G[0, 1:]) / G[0, 0]
+        self._X = self._X[1:]
+        self.pairs.pop(0)
+        self._offset += 1
+
+    def sync(self, pairs, version=None):
+        """
+        아카이브 (comment, rating) 전체 목록과 맞춤.
+        기존 학습 데이터 뒤에 행이 조금 추가된 경우면 증분, 아니면(수정/삭제/많이 추가) lock 밖에서 전체 재학습.
+        """
+        pairs = [(c, float(r)) for c, r in pairs]
+        with self._lock:
+            if version is not None and version == self.version:
+                return self
+            start, n = self._offset, len(self.pairs)
+            new = pairs[start + n:]
+            if n and pairs[start:start + n] == self.pairs and not self._needs_refit(len(new)):
+                for comment, rating in new:
+                    self.add(comment, rating)
+                self.version = version
+                return self
+        return self._refit(pairs, version=version)
+
+    def _solve(self):
+        y = np.array([r for _, r in self.pairs])
+        self._y_mean = float(y.mean())
+        r = y - self._y_mean
+        self._alpha = self._G @ r
+        # LOO 잔차 e_i = alpha_i / G_ii, LOO 예측 분산 v_i = 1/G_ii - λ
+        g = np.diag(self._G)
+        loo_err = self._alpha / g
+        loo_var = np.maximum(1 / g - self.lam, 0) + self.lam
+        self._scale = math.sqrt(float(np.mean(loo_err ** 2 / loo_var))) if len(y) > 1 else 1.0
+
+    # --- 예측 ---
+    def predict(self, comment):
+        """
+        (평점, 신뢰도) 반환. 평점은 0.5 단위, 신뢰도는 실제 평점과 ±0.5 안에 들 확률 추정 (0~1).
+        학습 데이터가 MIN_SAMPLES 미만이면 (None, 0.0).
+        """
+        with self._lock:
+            if len(self.pairs) < self.min_samples or self._alpha is None:
+                return None, 0.0
+            x = self._tfidf(hash_counts(comment))
+            k = (self._X @ x).astype(np.float64)
+            raw = self._y_mean + float(k @ self._alpha)
+            var = max(1.0 - float(k @ self._G @ k), 0.0) + self.lam
+            std = self._scale * math.sqrt(var)
+
+        rating = min(max(round(raw * 2) / 2, RATING_MIN), RATING_MAX)
+        confidence = math.erf(0.5 / (std * math.sqrt(2))) if std > 0 else 1.0
+        return rating, confidence
+
+
+def estimate_tokens(text):
+    """대략적인 토큰 수 (한글은 UTF-8 3바이트 ≈ 1토큰, 영문은 더 적게 잡힘 -> 보수적)"""
+    return len(str(text).encode("utf-8")) // 3 + 1
+
+
+class ExampleIndex:
+    """
+    Few-Shot 예시 검색용 유사도 인덱스.
+    - 과거 코멘트를 해시 문자 n-gram 벡터(L2 정규화)로 NumPy 행렬에 보관
+    - search(): 새 코멘트와 코사인 유사도가 높은 리뷰 top-k를 토큰 예산 안에서 선택
+    - 새 리뷰는 행 하나만 추가 (용량을 두 배씩 늘려 재할당 횟수 최소화)
+    """
+
+    def __init__(self, n_features=N_FEATURES):
+        self.n_features = n_features
+        self.version = None
+        self._lock = threading.RLock()
+        self.items = []           # (title, comment, rating)
+        self._M = np.zeros((0, n_features), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _vector(self, comment):
+        v = np.log1p(hash_counts(comment, self.n_features))
+        return v / max(float(np.linalg.norm(v)), 1e-9)
+
+    def add(self, title, comment, rating):
+        with self._lock:
+            n = len(self.items)
+            if n == self._M.shape[0]:
+                grown = np.zeros((max(64, n * 2), self.n_features), dtype=np.float32)
+                grown[:n] = self._M[:n]
+                self._M = grown
+            self._M[n] = self._vector(comment)
+            self.items.append((title, comment, rating))
+
+    def sync(self, items, version=None):
+        """아카이브와 맞춤: 뒤에 추가된 행만 add, 중간이 바뀌었으면 다시 만듦"""
+        with self._lock:
+            if version is not None and version == self.version:
+                return self
+            n = len(self.items)
+            if items[:n] != self.items:
+                self.items = []
+                self._M = np.zeros((0, self.n_features), dtype=np.float32)
+                n = 0
+            for item in items[n:]:
+                self.add(*item)
+            self.version = version
+            return self
+
+    def search(self, comment, k=5, token_budget=300, format_item=None, min_similarity=0.1):
+        """
+        유사한 리뷰를 최대 k개, 포맷한 줄의 토큰 합이 token_budget 이하가 되도록 선택.
+        유사한 리뷰가 부족하면 최근 리뷰로 채움. 반환: 포맷된 줄 리스트 (유사도 높은 순)
+        """
+        format_item = format_item or (lambda title, c, r: f"'{c}' -> {r}")
+        with self._lock:
+            n = len(self.items)
+            if not n:
+                return []
+            scores = self._M[:n] @ self._vector(comment)
+            similar = [int(i) for i in np.argsort(-scores, kind="stable")[:k * 2] if scores[i] >= min_similarity]
+            lines, used, seen = [], 0, set()
+            for i in similar + list(range(n - 1, -1, -1)):
+                if len(lines) >= k:
+                    break
+                if i in seen:
+                    continue
+                seen.add(i)
+                line = format_item(*self.items[i])
+                cost = estimate_tokens(line)
+                if used + cost > token_budget:
+                    continue
+                lines.append(line)
+                used += cost
+            return lines
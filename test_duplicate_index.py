@@ -0,0 +1,85 @@
+import os
+import tempfile
+
+from local_store import SheetMirror
+
+HEADER = ["Date", "Title", "Platform", "Rating", "Comment", "ReleaseDate", "Image",
+          "RunningTime", "CastCrew", "TMDBId", "MediaType"]
+
+
+class FakeSheet:
+    """get_all_values()만 있는 시트 대역 (full resync용)"""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_all_values(self):
+        return [HEADER] + [r + [""] * (len(HEADER) - len(r)) for r in self.rows]
+
+
+def test_duplicate_index():
+    print("Testing duplicate index (MediaType, TMDBId)...")
+
+    sheet = FakeSheet([
+        ["2024-01-01", "Movie 1399", "", "4", "", "", "", "", "", "1399", "movie"],
+        ["2024-01-02", "Old Record", "", "3"],  # backfill 전 (ID 없음)
+    ])
+    mirror = SheetMirror(os.path.join(tempfile.mkdtemp(), "media_db.sqlite"))
+    mirror.sync(sheet, force=True)
+
+    checks = [
+        # 같은 숫자 ID라도 movie / tv는 다른 작품
+        ("tv 1399 != movie 1399", mirror.lookup(title="왕좌의 게임", tmdb_id="1399", media_type="tv") is None),
+        ("movie 1399 == movie 1399", (mirror.lookup(title="다른 제목", tmdb_id="1399", media_type="movie") or [None])[0] == 2),
+        # ID 없는 행은 제목으로
+        ("untyped row matched by title", (mirror.lookup(title="old record", tmdb_id="5", media_type="tv") or [None])[0] == 3),
+        # ID가 다른 행은 제목이 같아도 다른 작품
+        ("id row not matched by title", mirror.lookup(title="Movie 1399", tmdb_id="7", media_type="movie") is None),
+        # 직접 입력(ID 없음)은 모든 행을 제목으로
+        ("manual entry matched by title", (mirror.lookup(title="Movie 1399") or [None])[0] == 2),
+    ]
+
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+    for name, passed in checks:
+        assert passed, name
+
+
+class PaddedSheet(FakeSheet):
+    """K열 뒤에 값이 하나 있는 시트: get_all_values는 모든 행을 그 폭까지 채우고, batch_get은 끝의 빈 셀을 자름"""
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.full_reads = 0
+
+    def get_all_values(self):
+        self.full_reads += 1
+        values = super().get_all_values()
+        values[-1] = values[-1] + ["stray"]
+        return [v + [""] * (len(HEADER) + 1 - len(v)) for v in values]
+
+    def batch_get(self, ranges):
+        return [[HEADER], [[r[1]] for r in self.rows], []]
+
+
+def test_header_padding():
+    print("Testing delta sync with a padded header...")
+
+    sheet = PaddedSheet([["2024-01-01", "A", "", "4", "", "", "", "", "", "1", "movie"]])
+    mirror = SheetMirror(os.path.join(tempfile.mkdtemp(), "media_db.sqlite"))
+    mirror.sync(sheet, force=True)
+    mirror._last_check = 0.0
+    changed = mirror.sync(sheet)
+
+    checks = [
+        ("header stored without trailing blanks", mirror.header == HEADER),
+        ("delta sync does not fall back to a full read", sheet.full_reads == 1 and not changed),
+    ]
+
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+    for name, passed in checks:
+        assert passed, name
+
+
+if __name__ == "__main__":
+    test_duplicate_index()
+    test_header_padding()
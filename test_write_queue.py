@@ -0,0 +1,110 @@
+import os
+import tempfile
+
+from local_store import SheetMirror, col_letter
+from write_queue import WriteBehindQueue
+
+HEADER = ["Date", "Title", "Platform", "Rating", "Comment", "ReleaseDate", "Image",
+          "RunningTime", "CastCrew", "TMDBId", "MediaType"]
+
+
+def row(title, tmdb_id="", media_type="", rating="3"):
+    return ["2024-01-01", title, "", rating, "", "", "", "", "", tmdb_id, media_type]
+
+
+class FakeSheet:
+    """get_all_values / batch_get / append_rows / batch_update만 있는 시트 대역"""
+    def __init__(self, rows):
+        self.rows = [list(r) for r in rows]
+
+    def get_all_values(self):
+        return [HEADER] + [list(r) for r in self.rows]
+
+    def batch_get(self, ranges):
+        # SheetMirror._delta_sync 용: ["1:1", "B2:B", "A{n}:K"]
+        header, titles, tail = ranges
+        start = int("".join(ch for ch in tail.split(":")[0] if ch.isdigit()))
+        return [[HEADER], [[r[1]] for r in self.rows], [list(r) for r in self.rows[start - 2:]]]
+
+    def append_rows(self, values):
+        first = len(self.rows) + 2
+        self.rows += [list(v) for v in values]
+        last = len(self.rows) + 1
+        return {"updates": {"updatedRange": f"Sheet1!A{first}:{col_letter(len(HEADER))}{last}"}}
+
+    def batch_update(self, data):
+        for item in data:
+            r = int(item["range"].split(":")[0][1:])
+            self.rows[r - 2] = list(item["values"][0])
+
+
+def make_queue(sheet):
+    tmp = tempfile.mkdtemp()
+    mirror = SheetMirror(os.path.join(tmp, "media_db.sqlite"))
+    mirror.sync(sheet, force=True)
+    queue = WriteBehindQueue(lambda: sheet, mirror, path=os.path.join(tmp, "write_queue.sqlite"), max_batch=100)
+    return queue, mirror
+
+
+def test_write_queue_drift():
+    print("Testing write-behind flush after append drift...")
+
+    # 1. 다른 곳에서 행이 추가됨 -> 같은 배치의 update는 실제로 추가된 행으로
+    sheet = FakeSheet([row("A", "1", "movie")])
+    queue, mirror = make_queue(sheet)
+    sheet.rows.append(row("Other Device", "9", "tv"))
+    queue.append(row("New", "2", "movie"))          # 미러 기준 3행 (실제로는 4행)
+    queue.update(3, row("New", "2", "movie", "5"))  # 방금 추가한 행 수정
+    queue.update(2, row("A", "1", "movie", "4"))    # 기존 행 수정
+    queue.flush()
+    appended_ok = [r[1] for r in sheet.rows] == ["A", "Other Device", "New"] and sheet.rows[2][3] == "5"
+    existing_ok = sheet.rows[0][3] == "4" and sheet.rows[1] == row("Other Device", "9", "tv")
+    mirror_ok = (mirror.lookup(title="New", tmdb_id="2", media_type="movie") or [None])[0] == 4
+
+    # 2. 다른 곳에서 행이 삭제됨 -> 기존 행 update는 재동기화된 미러에서 다시 찾음
+    sheet = FakeSheet([row("A", "1", "movie"), row("B", "2", "tv")])
+    queue, mirror = make_queue(sheet)
+    del sheet.rows[0]
+    queue.append(row("C", "3", "movie"))            # 미러 기준 4행 (실제로는 3행)
+    queue.update(3, row("B", "2", "tv", "5"))       # 미러 기준 B = 3행 (실제로는 2행)
+    queue.flush()
+    resolved_ok = [(r[1], r[3]) for r in sheet.rows] == [("B", "5"), ("C", "3")]
+
+    checks = [
+        ("update to appended row follows the drift", appended_ok),
+        ("update to existing row untouched by appends elsewhere", existing_ok),
+        ("mirror resynced after drift", mirror_ok),
+        ("update re-resolved after rows were deleted", resolved_ok),
+        ("spool empty", queue.pending() == 0),
+    ]
+
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+    for name, passed in checks:
+        assert passed, name
+
+
+def test_write_queue_sync():
+    print("Testing flush + sync with a deferred append...")
+
+    sheet = FakeSheet([row("A", "1", "movie")])
+    queue, mirror = make_queue(sheet)
+    queue.append(row("New", "7", "movie"))  # 찜/차단처럼 defer (아직 전송 안 됨)
+    mirror._last_check = 0.0                # delta sync 시점
+    queue.sync()
+
+    checks = [
+        ("deferred append sent before sync", [r[1] for r in sheet.rows] == ["A", "New"]),
+        ("row kept in mirror after sync", (mirror.lookup(title="New", tmdb_id="7", media_type="movie") or [None])[0] == 3),
+        ("spool empty", queue.pending() == 0),
+    ]
+
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+    for name, passed in checks:
+        assert passed, name
+
+
+if __name__ == "__main__":
+    test_write_queue_drift()
+    test_write_queue_sync()
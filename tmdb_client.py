@@ -0,0 +1,122 @@
+import random
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from disk_cache import make_key
+
+TMDB_BASE = "https://api.themoviedb.org/3"
+
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+MAX_RETRIES = 3            # 429/5xx/네트워크 오류 재시도 횟수
+RETRY_BUDGET = 8.0         # 재시도 대기에 쓸 수 있는 총 시간 (초)
+BACKOFF_BASE = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 엔드포인트별 캐시 TTL (초)
+TTLS = [
+    (r"^search/", 24 * 3600),
+    (r"^trending/", 3600),
+    (r"/recommendations$", 24 * 3600),
+    (r"^(movie|tv)/\d+$", 24 * 3600),  # 상세 (OTT 제공 정보가 바뀔 수 있으므로 하루)
+]
+DEFAULT_TTL = 3600
+
+
+def _ttl(path):
+    for pattern, ttl in TTLS:
+        if re.search(pattern, path):
+            return ttl
+    return DEFAULT_TTL
+
+
+class TMDBClient:
+    """
+    TMDB 전용 HTTP 클라이언트.
+    - requests.Session 커넥션 풀 (keep-alive, TCP/TLS 핸드셰이크 재사용)
+    - connect/read 타임아웃 -> 응답 없는 TMDB가 rerun을 무한정 붙잡지 않음
+    - 429/5xx는 지수 백오프 + jitter로 제한된 횟수/시간만 재시도 (Retry-After 존중)
+    - 선택: DiskCache (엔드포인트별 TTL + ETag/Last-Modified 재검증)
+    """
+
+    def __init__(self, api_key, cache=None, pool_size=16):
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept"] = "application/json"
+
+        # v4 Read Access Token(JWT)은 헤더로 인증, v3 API key는 헤더 인증을 지원하지 않아 쿼리로 전달
+        self._params = {}
+        if api_key and api_key.startswith("eyJ"):
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        elif api_key:
+            self._params["api_key"] = api_key
+
+    def _request(self, path, params, headers):
+        deadline = time.monotonic() + RETRY_BUDGET
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = self.session.get(
+                    f"{TMDB_BASE}/{path}",
+                    params={**params, **self._params},
+                    headers=headers,
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                )
+                if response.status_code not in RETRY_STATUS:
+                    return response
+                wait = float(response.headers.get("Retry-After") or BACKOFF_BASE * 2 ** attempt)
+                error = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                wait = BACKOFF_BASE * 2 ** attempt
+                error = e
+
+            wait += random.uniform(0, BACKOFF_BASE)  # jitter
+            if attempt == MAX_RETRIES or time.monotonic() + wait > deadline:
+                if error:
+                    raise error
+                return response
+            time.sleep(wait)
+
+    def get(self, path, **params):
+        """
+        GET -> JSON. 캐시 key = (엔드포인트, 파라미터, 언어); 인증 정보는 key에서 제외.
+        신선한 캐시면 네트워크 없이 반환, 만료됐으면 조건부 요청(304면 캐시 재사용).
+        200 응답만 캐시함. 그 외 상태(재시도 후에도 429, 401, 404, 5xx)는 requests.HTTPError
+        -> 호출 쪽(cached_result 등)이 '결과 없음'이 아니라 실패로 처리하도록.
+        """
+        if self.cache is None:
+            response = self._request(path, params, {})
+            response.raise_for_status()
+            return response.json()
+
+        key = make_key("tmdb", path, params)
+        entry = self.cache.get(key)
+        if entry and entry.fresh:
+            return entry.value
+
+        headers = {}
+        if entry:
+            if entry.meta.get('etag'): headers['If-None-Match'] = entry.meta['etag']
+            if entry.meta.get('last_modified'): headers['If-Modified-Since'] = entry.meta['last_modified']
+
+        response = self._request(path, params, headers)
+        ttl = _ttl(path)
+
+        if response.status_code == 304 and entry:
+            self.cache.touch(key, ttl)
+            return entry.value
+
+        if response.status_code != 200:
+            response.raise_for_status()
+            raise requests.HTTPError(f"{response.status_code} for {path}", response=response)
+
+        data = response.json()
+        self.cache.set(key, data, ttl, meta={
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        })
+        return data
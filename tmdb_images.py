@@ -0,0 +1,105 @@
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+IMAGE_BASE = "https://image.tmdb.org/t/p/"
+
+# 렌더링 위치별 TMDB 이미지 크기 (표시 폭의 약 2배 = 레티나 기준)
+SIZES = {
+    "thumb": "w154",        # 중복 비교 썸네일 (120px)
+    "grid": "w185",         # 검색 그리드 6열 / 찜 4열 / Review Log 카드
+    "card": "w342",         # 최근 기록 3열, 추천 카드, 확인 화면 미리보기
+    "poster": "w500",       # 선택 화면 큰 포스터 (시트에 저장하는 기본 크기)
+    "hero": "w1280",        # 히어로 배경 (backdrop; original은 수 MB)
+    "hero_poster": "w780",  # backdrop이 없을 때 포스터로 대신하는 히어로 (포스터에는 w1280이 없음)
+}
+LOCAL_CONTEXTS = {"thumb", "grid", "card"}  # 로컬 썸네일 캐시 대상 (작은 이미지만)
+
+MAX_FILES = 3000          # 로컬 썸네일 최대 개수 (넘으면 먼저 받은 파일부터 삭제)
+DOWNLOAD_TIMEOUT = 10
+
+_TMDB_URL = re.compile(r"^https?://image\.tmdb\.org/t/p/[^/]+(/.+)$")
+
+
+def image_url(path_or_url, context="poster"):
+    """
+    TMDB 이미지 경로('/abc.jpg') 또는 저장된 TMDB URL(…/t/p/w500/abc.jpg) -> context에 맞는 크기의 URL.
+    TMDB가 아닌 URL(직접 입력 포스터 등)은 그대로, 값이 없으면 "".
+    """
+    if not path_or_url:
+        return ""
+    value = str(path_or_url)
+    if value.startswith("/"):
+        return f"{IMAGE_BASE}{SIZES[context]}{value}"
+    match = _TMDB_URL.match(value)
+    if match:
+        return f"{IMAGE_BASE}{SIZES[context]}{match.group(1)}"
+    return value
+
+
+class ThumbnailCache:
+    """
+    작은 TMDB 이미지를 로컬 디렉터리에 보관 (Streamlit static 폴더 -> app/static/... 으로 서빙).
+    - local_path(url): 이미 받아 둔 파일 경로, 없으면 백그라운드 다운로드를 걸고 None (화면은 원격 URL로 먼저 그림)
+    - 파일명 = URL 해시 -> 같은 이미지는 프로세스/재시작 간 재사용
+    """
+
+    def __init__(self, directory, url_prefix, max_files=MAX_FILES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_files = max_files
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbs")
+        self._session = requests.Session()
+
+    def _filename(self, url):
+        ext = os.path.splitext(url)[1].lower() or ".jpg"
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:24] + ext
+
+    def local_path(self, url):
+        if not _TMDB_URL.match(str(url)):
+            return None
+        name = self._filename(url)
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            return path
+        with self._lock:
+            if name not in self._pending:
+                self._pending.add(name)
+                self._pool.submit(self._download, url, path, name)
+        return None
+
+    def static_url(self, path):
+        return f"{self.url_prefix}/{os.path.basename(path)}"
+
+    def _download(self, url, path, name):
+        try:
+            response = self._session.get(url, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(response.content)
+            os.replace(tmp, path)  # 반쯤 쓴 파일이 서빙되지 않도록
+            self._prune()
+        except Exception as e:
+            print(f"Thumbnail download failed ({url}): {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def _prune(self):
+        files = [e for e in os.scandir(self.directory) if e.is_file() and not e.name.endswith(".tmp")]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda e: e.stat().st_mtime)
+        for entry in files[:len(files) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
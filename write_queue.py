@@ -0,0 +1,186 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+
+from local_store import CACHE_DIR, MEDIA_TYPE_COLUMN, TMDB_ID_COLUMN, col_letter
+
+FLUSH_INTERVAL = 5.0   # 타이머 flush 주기 (초)
+MAX_BATCH = 10         # 이 개수 이상 쌓이면 즉시 flush
+
+
+def updated_row(response):
+    """append 응답의 updatedRange ("Sheet1!A57:I57")에서 실제 기록된 첫 행 번호 추출"""
+    try:
+        cell = response['updates']['updatedRange'].split('!')[-1].split(':')[0]
+        return int(''.join(ch for ch in cell if ch.isdigit()))
+    except Exception:
+        return None
+
+
+class WriteBehindQueue:
+    """
+    시트 쓰기 write-behind 큐.
+    - append/update를 로컬 스풀(SQLite)에 먼저 기록하고 미러(SheetMirror)에는 즉시 반영
+    - 타이머(FLUSH_INTERVAL) 또는 개수(MAX_BATCH) 기준으로 append_rows + batch_update 한 번에 전송
+    - 프로세스가 죽어도 스풀이 남아 있으므로 재시작 시 이어서 전송 (at-least-once)
+    """
+
+    def __init__(self, get_sheet, store, path=None, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH):
+        path = path or os.path.join(CACHE_DIR, "write_queue.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._get_sheet = get_sheet
+        self._store = store
+        self._flush_interval = flush_interval
+        self._max_batch = max_batch
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ops (
+                id      INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind    TEXT,     -- 'append' | 'update'
+                row_idx INTEGER,  -- append: 미러에 반영된 예상 행 번호 / update: 대상 행 번호
+                data    TEXT      -- 셀 값 (JSON list)
+            )
+        """)
+        self._conn.commit()
+        self.last_error = None
+        self._thread = None
+
+    def start(self):
+        """백그라운드 타이머 flush 시작 (스풀에 남은 작업도 이어서 전송)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sheet-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self._flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Write-behind Flush Error: {e}")
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ops").fetchone()[0]
+
+    def _enqueue(self, kind, row_idx, values):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO ops (kind, row_idx, data) VALUES (?, ?, ?)",
+                    (kind, row_idx, json.dumps(list(values), ensure_ascii=False, default=str)),
+                )
+            if self.pending() >= self._max_batch:
+                self.flush()
+
+    # 미러 반영 + 스풀 기록은 큐 lock 안에서 한 번에 (sync()가 그 사이에 끼어들지 않도록)
+    def append(self, row_data):
+        with self._lock:
+            row_idx = self._store.apply_append(row_data)
+            self._enqueue('append', row_idx, row_data)
+
+    def update(self, row_idx, row_data):
+        with self._lock:
+            self._store.apply_update(row_idx, row_data)
+            self._enqueue('update', row_idx, row_data)
+
+    def sync(self, force=False):
+        """
+        flush 후 미러 동기화 (큐 lock 안에서 한 번에).
+        전송 안 된 행이 남아 있으면 delta sync가 그 행을 drift로 보고 전체 재동기화하면서 미러에서 지워버리므로
+        스풀이 비었을 때만 동기화. flush 실패는 예외로 올림 (미러는 그대로).
+        """
+        with self._lock:
+            if not force and not self._store.sync_due():
+                return False
+            self.flush()
+            if self.pending():
+                return False
+            return self._store.sync(self._get_sheet(), force=force)
+
+    def _resolve_row(self, values):
+        """재동기화된 미러에서 update 대상 행을 다시 찾음 (TMDB ID -> 제목). 못 찾으면 None"""
+        record = dict(zip(self._store.header, values))
+        hit = self._store.lookup(record.get("Title"), record.get(TMDB_ID_COLUMN), record.get(MEDIA_TYPE_COLUMN))
+        return hit[0] if hit else None
+
+    def flush(self):
+        """
+        스풀에 쌓인 작업을 API 최대 2회(append_rows 1회 + batch_update 1회)로 전송.
+        append가 예상과 다른 행에 들어가면(drift) 미러를 재동기화하고 update 대상 행 번호를 다시 맞춤.
+        실패하면 스풀을 그대로 두고 예외를 올림 (다음 flush에서 재시도).
+        """
+        with self._lock:
+            ops = self._conn.execute("SELECT id, kind, row_idx, data FROM ops ORDER BY id").fetchall()
+            if not ops:
+                return 0
+
+            appends = [(i, r, json.loads(d)) for i, k, r, d in ops if k == 'append']
+            updates = [(i, r, json.loads(d)) for i, k, r, d in ops if k == 'update']
+            sheet = self._get_sheet()
+
+            try:
+                # 1. Append 먼저 (같은 배치 안의 update가 새 행을 가리킬 수 있으므로)
+                offset = 0
+                if appends:
+                    response = sheet.append_rows([v for _, _, v in appends])
+                    first_row = updated_row(response)
+                    expected = appends[0][1]
+                    if first_row is not None and expected is not None and first_row != expected:
+                        offset = first_row - expected
+                    with self._conn:
+                        self._conn.executemany("DELETE FROM ops WHERE id = ?", [(i,) for i, _, _ in appends])
+
+                if offset:
+                    # 다른 곳에서 행이 추가/삭제됨 -> 미러를 바로 재동기화 (이후 update가 낡은 행 번호를 쓰지 않도록)
+                    self._store.sync(sheet, force=True)
+                    updates = self._remap_updates(updates, expected, len(appends), offset)
+
+                # 2. Range update 일괄 전송
+                if updates:
+                    sheet.batch_update([
+                        {"range": f"A{r}:{col_letter(len(v))}{r}", "values": [v]} for _, r, v in updates
+                    ])
+                    with self._conn:
+                        self._conn.executemany("DELETE FROM ops WHERE id = ?", [(i,) for i, _, _ in updates])
+                    if offset:
+                        # 재동기화는 update 전송 전이었으므로 보정된 행에 다시 반영
+                        for _, r, v in updates:
+                            self._store.apply_update(r, v)
+            except Exception as e:
+                self.last_error = e
+                raise
+
+            self.last_error = None
+            return len(ops)
+
+    def _remap_updates(self, updates, expected, count, offset):
+        """
+        drift 후 update 대상 행 번호 보정.
+        - 이번 배치에서 추가한 행: 실제로 기록된 위치로 offset만큼 이동
+        - 기존 행: 시트 끝에 행이 추가된 경우(offset > 0)는 그대로, 삭제된 경우는 재동기화된 미러에서 다시 찾음
+        다시 찾지 못한 update는 내용이 사라지지 않도록 새 행으로 추가
+        """
+        remapped, orphans = [], []
+        for i, r, v in updates:
+            if expected <= r < expected + count:
+                remapped.append((i, r + offset, v))
+            elif offset > 0:
+                remapped.append((i, r, v))
+            else:
+                row_idx = self._resolve_row(v)
+                if row_idx is None:
+                    orphans.append((i, r, v))
+                else:
+                    remapped.append((i, row_idx, v))
+        if orphans:
+            self._get_sheet().append_rows([v for _, _, v in orphans])
+            with self._conn:
+                self._conn.executemany("DELETE FROM ops WHERE id = ?", [(i,) for i, _, _ in orphans])
+            self._store.invalidate()
+        return remapped
+